@@ -1,116 +1,291 @@
 import os
+import platform
 import shutil
+import stat
 import subprocess
-import base64
+import binascii
+import orjson
+import itertools
+import multiprocessing
 import fitz
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import asyncio
 
-app = FastAPI()
-preview_cache = {}
-executor = ThreadPoolExecutor(max_workers=8)
+app = FastAPI(default_response_class=ORJSONResponse)
+RENDER_WORKERS = min(os.cpu_count() or 1, 4)
 
-def render_pdf_preview(pdf_path: str, target_width: int = 1200) -> str:
-    if pdf_path in preview_cache:
-        return preview_cache[pdf_path]
-    
+def new_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+executor = new_executor()
+pending_renders = {}
+page_counts = {}
+warmup_tasks = set()
+warmup_semaphore = None
+
+PREVIEW_CACHE_BYTES = int(os.environ.get("PREVIEW_CACHE_MB", "256")) * 1024 * 1024
+
+LETTER_WIDTH = 612
+THUMB_WIDTH = 1200
+THUMB_MATRIX = fitz.Matrix(THUMB_WIDTH / LETTER_WIDTH, THUMB_WIDTH / LETTER_WIDTH)
+IMAGE_WIDTH = 1400
+
+THUMB_VARIANT = f"preview:{THUMB_WIDTH}"
+IMAGE_VARIANT = f"image:{IMAGE_WIDTH}"
+
+def page_variant(page_index: int, width: int = THUMB_WIDTH) -> str:
+    return f"page:{page_index}:{width}"
+PAGE_COUNT_ENTRIES = 4096
+
+@dataclass
+class PdfMeta:
+    jpeg: bytes
+    page_count: int
+
+class PreviewCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= self._sizeof(old)
+        self._entries[key] = value
+        self._bytes += self._sizeof(value)
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= self._sizeof(evicted)
+
+    @staticmethod
+    def _sizeof(value) -> int:
+        return len(value.jpeg)
+
+preview_cache = PreviewCache(PREVIEW_CACHE_BYTES)
+
+def file_key(st):
+    return (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+def cache_key(pdf_path: str, variant: str, st=None):
+    if st is None:
+        st = os.stat(pdf_path)
+    return (file_key(st), variant)
+
+def make_etag(st, variant: str) -> str:
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}-{variant}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+def render_jpeg(pdf_path: str, page_index: int = 0, target_width: int = THUMB_WIDTH, quality: int = 70, gray: bool = True, annots: bool = True) -> PdfMeta:
     try:
         doc = fitz.open(pdf_path)
-        page = doc[0]
+        page = doc[page_index]
         page_width = page.rect.width
-        scale = target_width / page_width
-        mat = fitz.Matrix(scale, scale)
-        pix = page.get_pixmap(matrix=mat, alpha=False, colorspace=fitz.csGRAY)
-        img_bytes = pix.tobytes("jpeg", 75)
+        if target_width == THUMB_WIDTH and abs(page_width - LETTER_WIDTH) <= LETTER_WIDTH * 0.1:
+            mat = THUMB_MATRIX
+        else:
+            scale = target_width / page_width
+            mat = fitz.Matrix(scale, scale)
+        colorspace = fitz.csGRAY if gray else fitz.csRGB
+        pix = page.get_pixmap(matrix=mat, alpha=False, colorspace=colorspace, annots=annots)
+        meta = PdfMeta(pix.tobytes("jpeg", quality), len(doc))
         doc.close()
-        b64 = base64.b64encode(img_bytes).decode('utf-8')
-        preview_cache[pdf_path] = b64
-        return b64
+        return meta
     except:
         return None
 
-def render_all_pages(pdf_path: str, target_width: int = 1200) -> list:
-    cache_key = pdf_path + "_all"
-    if cache_key in preview_cache:
-        return preview_cache[cache_key]
-    
+def render_thumbnail(pdf_path: str) -> PdfMeta:
+    return render_jpeg(pdf_path, 0, THUMB_WIDTH, quality=75, gray=True, annots=False)
+
+def render_preview_image(pdf_path: str) -> PdfMeta:
+    return render_jpeg(pdf_path, 0, IMAGE_WIDTH, quality=90, gray=False)
+
+def read_page_count(pdf_path: str) -> int:
     try:
         doc = fitz.open(pdf_path)
-        pages = []
-        for page in doc:
-            page_width = page.rect.width
-            scale = target_width / page_width
-            mat = fitz.Matrix(scale, scale)
-            pix = page.get_pixmap(matrix=mat, alpha=False, colorspace=fitz.csGRAY)
-            img_bytes = pix.tobytes("jpeg", 70)
-            b64 = base64.b64encode(img_bytes).decode('utf-8')
-            pages.append(b64)
+        count = len(doc)
         doc.close()
-        preview_cache[cache_key] = pages
-        return pages
+        return count
     except:
-        return []
+        return None
 
-def open_folder_dialog():
-    import platform
-    import sys
-    
-    system = platform.system()
-    
-    if system == "Darwin":
-        script = '''
-        tell application "System Events"
-            activate
-            set theFolder to choose folder with prompt "Select a folder"
-            return POSIX path of theFolder
-        end tell
-        '''
+def encode_base64(img_bytes: bytes) -> str:
+    return binascii.b2a_base64(img_bytes, newline=False).decode('ascii')
+
+def encode_page_line(page_index: int, img_bytes: bytes) -> bytes:
+    return orjson.dumps({"page": page_index, "data": encode_base64(img_bytes)}) + b"\n"
+
+def encode_page_error(page_index: int, detail: str) -> bytes:
+    return orjson.dumps({"page": page_index, "error": detail}) + b"\n"
+
+def cached_page_count(st) -> int:
+    return page_counts.get(file_key(st))
+
+def remember_page_count(fkey, count: int):
+    page_counts[fkey] = count
+    if len(page_counts) > PAGE_COUNT_ENTRIES:
+        page_counts.pop(next(iter(page_counts)))
+
+async def astat(path):
+    loop = asyncio.get_event_loop()
+    try:
+        return await loop.run_in_executor(None, os.stat, path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+async def run_in_pool(func, *args):
+    global executor
+    loop = asyncio.get_event_loop()
+    for _ in range(2):
+        pool = executor
         try:
-            result = subprocess.run(
-                ['osascript', '-e', script],
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                return result.stdout.strip()
-        except:
-            pass
-    
-    elif system == "Windows":
+            return await loop.run_in_executor(pool, func, *args)
+        except BrokenProcessPool:
+            if executor is pool:
+                pool.shutdown(wait=False)
+                executor = new_executor()
+    return None
+
+async def render_and_cache(key, func, *args) -> PdfMeta:
+    try:
+        meta = await run_in_pool(func, *args)
+        if meta is not None:
+            preview_cache.put(key, meta)
+            remember_page_count(key[0], meta.page_count)
+        return meta
+    finally:
+        pending_renders.pop(key, None)
+
+async def get_page_count_for(pdf_path: str, st) -> int:
+    count = cached_page_count(st)
+    if count is None:
+        loop = asyncio.get_event_loop()
+        count = await loop.run_in_executor(None, read_page_count, pdf_path)
+        if count is not None:
+            remember_page_count(file_key(st), count)
+    return count
+
+async def cached_render(key, func, *args) -> bytes:
+    meta = preview_cache.get(key)
+    if meta is None:
+        pending = pending_renders.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(render_and_cache(key, func, *args))
+            pending_renders[key] = pending
+        meta = await asyncio.shield(pending)
+        if meta is None:
+            return None
+    return meta.jpeg
+
+async def warm_preview(pdf_path: str):
+    async with warmup_semaphore:
         try:
-            import tkinter as tk
-            from tkinter import filedialog
-            root = tk.Tk()
-            root.withdraw()
+            st = await astat(pdf_path)
+        except OSError:
+            return
+        if st is None:
+            return
+        key = cache_key(pdf_path, IMAGE_VARIANT, st)
+        await cached_render(key, render_preview_image, pdf_path)
+
+def start_warmup(paths: list):
+    global warmup_semaphore
+    if warmup_semaphore is None:
+        warmup_semaphore = asyncio.Semaphore(RENDER_WORKERS)
+    for task in warmup_tasks:
+        task.cancel()
+    warmup_tasks.clear()
+    for pdf_path in paths:
+        task = asyncio.ensure_future(warm_preview(pdf_path))
+        warmup_tasks.add(task)
+        task.add_done_callback(warmup_tasks.discard)
+
+MACOS_PICKER_SCRIPT = '''
+tell application "System Events"
+    activate
+    set theFolder to choose folder with prompt "Select a folder"
+    return POSIX path of theFolder
+end tell
+'''
+
+_tk = None
+
+def _load_tk():
+    global _tk
+    if _tk is None:
+        import tkinter
+        import tkinter.filedialog
+        _tk = tkinter
+    return _tk
+
+def _macos_picker():
+    try:
+        result = subprocess.run(
+            ['osascript', '-e', MACOS_PICKER_SCRIPT],
+            capture_output=True,
+            text=True,
+            timeout=120
+        )
+        if result.returncode == 0 and result.stdout.strip():
+            return result.stdout.strip()
+    except:
+        pass
+    return None
+
+def _tk_picker(topmost: bool = False):
+    try:
+        tk = _load_tk()
+        root = tk.Tk()
+        root.withdraw()
+        if topmost:
             root.attributes('-topmost', True)
-            folder = filedialog.askdirectory()
-            root.destroy()
-            if folder:
-                return folder
-        except:
-            pass
-    
-    else:
-        try:
-            import tkinter as tk
-            from tkinter import filedialog
-            root = tk.Tk()
-            root.withdraw()
-            folder = filedialog.askdirectory()
-            root.destroy()
-            if folder:
-                return folder
-        except:
-            pass
-    
+        folder = tk.filedialog.askdirectory()
+        root.destroy()
+        if folder:
+            return folder
+    except:
+        pass
     return None
 
+def _windows_picker():
+    return _tk_picker(topmost=True)
+
+def _linux_picker():
+    return _tk_picker()
+
+_pick_folder_impl = {
+    "Darwin": _macos_picker,
+    "Windows": _windows_picker,
+}.get(platform.system(), _linux_picker)
+
+def open_folder_dialog():
+    return _pick_folder_impl()
+
 @app.get("/api/pick-folder")
 async def pick_folder():
     folder = open_folder_dialog()
@@ -134,73 +309,108 @@ class PreviewRequest(BaseModel):
 async def root():
     return FileResponse("static/index.html")
 
+def list_pdfs(path: Path) -> list:
+    with os.scandir(path.absolute()) as it:
+        entries = [
+            (entry.name.lower(), entry.name, entry.path)
+            for entry in it
+            if entry.name.lower().endswith(".pdf") and entry.is_file()
+        ]
+    
+    entries.sort()
+    return [{"name": name, "path": pdf_path} for _, name, pdf_path in entries]
+
 @app.post("/api/scan-directory")
 async def scan_directory(request: DirectoryRequest):
     path = Path(request.path).expanduser()
-    if not path.exists():
+    st = await astat(path)
+    if st is None:
         raise HTTPException(status_code=404, detail="Directory not found")
-    if not path.is_dir():
+    if not stat.S_ISDIR(st.st_mode):
         raise HTTPException(status_code=400, detail="Path is not a directory")
     
-    pdfs = []
-    for file in path.iterdir():
-        if file.suffix.lower() == ".pdf":
-            pdfs.append({
-                "name": file.name,
-                "path": str(file.absolute())
-            })
-    
-    pdfs = sorted(pdfs, key=lambda x: x["name"])
-    
     loop = asyncio.get_event_loop()
-    for pdf in pdfs[:10]:
-        loop.run_in_executor(executor, render_pdf_preview, pdf["path"])
+    pdfs = await loop.run_in_executor(None, list_pdfs, path)
+    
+    start_warmup([pdf["path"] for pdf in pdfs[:10]])
     
     return {"pdfs": pdfs}
 
 @app.post("/api/preview")
 async def get_preview(request: PreviewRequest):
     path = request.path
-    if not Path(path).exists():
+    st = await astat(path)
+    if st is None:
         raise HTTPException(status_code=404, detail="PDF not found")
     
-    loop = asyncio.get_event_loop()
-    preview = await loop.run_in_executor(executor, render_pdf_preview, path)
+    preview = await cached_render(cache_key(path, THUMB_VARIANT, st), render_thumbnail, path)
     
     if preview:
-        return {"preview": preview}
+        return {"preview": encode_base64(preview)}
     raise HTTPException(status_code=500, detail="Failed to render preview")
 
 @app.post("/api/all-pages")
 async def get_all_pages(request: PreviewRequest):
     path = request.path
-    if not Path(path).exists():
+    st = await astat(path)
+    if st is None:
         raise HTTPException(status_code=404, detail="PDF not found")
     
     loop = asyncio.get_event_loop()
-    pages = await loop.run_in_executor(executor, render_all_pages, path)
+    count = await get_page_count_for(path, st)
+    if count is None:
+        raise HTTPException(status_code=500, detail="Failed to read PDF")
+    
+    semaphore = asyncio.Semaphore(RENDER_WORKERS)
     
-    return {"pages": pages}
+    async def render_indexed(i):
+        async with semaphore:
+            return i, await cached_render(cache_key(path, page_variant(i), st), render_jpeg, path, i, THUMB_WIDTH)
+    
+    async def stream_pages():
+        tasks = [asyncio.ensure_future(render_indexed(i)) for i in range(count)]
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                i, img_bytes = await next_page
+                if img_bytes is None:
+                    yield encode_page_error(i, "Failed to render")
+                else:
+                    yield await loop.run_in_executor(None, encode_page_line, i, img_bytes)
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(stream_pages(), media_type="application/x-ndjson")
 
 @app.post("/api/page-count")
 async def get_page_count(request: PreviewRequest):
     path = request.path
-    if not Path(path).exists():
+    st = await astat(path)
+    if st is None:
         raise HTTPException(status_code=404, detail="PDF not found")
     
-    try:
-        doc = fitz.open(path)
-        count = len(doc)
-        doc.close()
-        return {"count": count}
-    except:
+    count = await get_page_count_for(path, st)
+    if count is None:
         raise HTTPException(status_code=500, detail="Failed to read PDF")
+    return {"count": count}
 
 class UndoRequest(BaseModel):
     sorted_path: str
     backup_path: str
     original_folder: str
 
+def restore_move(sorted_path: Path, backup_path: Path, original_folder: Path) -> str:
+    if sorted_path.exists():
+        sorted_path.unlink()
+    
+    if backup_path and backup_path.exists():
+        original_name = backup_path.name
+        original_dest = original_folder / original_name
+        shutil.move(str(backup_path), str(original_dest))
+        return str(original_dest)
+    
+    return None
+
 @app.post("/api/undo-move")
 async def undo_move(request: UndoRequest):
     sorted_path = Path(request.sorted_path)
@@ -208,61 +418,115 @@ async def undo_move(request: UndoRequest):
     original_folder = Path(request.original_folder)
     
     try:
-        if sorted_path.exists():
-            sorted_path.unlink()
-        
-        if backup_path and backup_path.exists():
-            original_name = backup_path.name
-            original_dest = original_folder / original_name
-            shutil.move(str(backup_path), str(original_dest))
-            return {"success": True, "restored_path": str(original_dest)}
-        
-        return {"success": True, "restored_path": None}
+        loop = asyncio.get_event_loop()
+        restored_path = await loop.run_in_executor(None, restore_move, sorted_path, backup_path, original_folder)
+        return {"success": True, "restored_path": restored_path}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to undo: {str(e)}")
 
 @app.get("/api/preview-image/{pdf_path:path}")
-async def get_preview_image(pdf_path: str):
+async def get_preview_image(pdf_path: str, request: Request):
     if not pdf_path.startswith("/"):
         pdf_path = "/" + pdf_path
     
-    if not Path(pdf_path).exists():
+    st = await astat(pdf_path)
+    if st is None:
         raise HTTPException(status_code=404, detail="PDF not found")
     
-    loop = asyncio.get_event_loop()
+    headers = {
+        "Cache-Control": "public, max-age=86400",
+        "ETag": make_etag(st, IMAGE_VARIANT)
+    }
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
     
-    if pdf_path in preview_cache:
-        img_bytes = base64.b64decode(preview_cache[pdf_path])
-    else:
-        try:
-            doc = fitz.open(pdf_path)
-            page = doc[0]
-            target_width = 1400
-            scale = target_width / page.rect.width
-            mat = fitz.Matrix(scale, scale)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            img_bytes = pix.tobytes("jpeg", 90)
-            doc.close()
-            preview_cache[pdf_path] = base64.b64encode(img_bytes).decode('utf-8')
-        except:
-            raise HTTPException(status_code=500, detail="Failed to render")
+    key = cache_key(pdf_path, IMAGE_VARIANT, st)
+    img_bytes = await cached_render(key, render_preview_image, pdf_path)
+    if img_bytes is None:
+        raise HTTPException(status_code=500, detail="Failed to render")
     
-    return Response(content=img_bytes, media_type="image/jpeg", headers={
-        "Cache-Control": "public, max-age=86400"
-    })
+    return Response(content=img_bytes, media_type="image/jpeg", headers=headers)
+
+@app.get("/api/page-image/{pdf_path:path}")
+async def get_page_image(pdf_path: str, request: Request, page: int = 0, w: int = THUMB_WIDTH):
+    if not pdf_path.startswith("/"):
+        pdf_path = "/" + pdf_path
+    if page < 0:
+        raise HTTPException(status_code=400, detail="Invalid page")
+    w = max(100, min(w, 4000))
+    
+    st = await astat(pdf_path)
+    if st is None:
+        raise HTTPException(status_code=404, detail="PDF not found")
+    
+    variant = page_variant(page, w)
+    headers = {
+        "Cache-Control": "public, max-age=86400",
+        "ETag": make_etag(st, variant)
+    }
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    key = cache_key(pdf_path, variant, st)
+    img_bytes = await cached_render(key, render_jpeg, pdf_path, page, w)
+    if img_bytes is None:
+        count = await get_page_count_for(pdf_path, st)
+        if count is not None and page >= count:
+            raise HTTPException(status_code=404, detail="Page not found")
+        raise HTTPException(status_code=500, detail="Failed to render")
+    
+    return Response(content=img_bytes, media_type="image/jpeg", headers=headers)
 
 @app.post("/api/validate-folder")
 async def validate_folder(request: DirectoryRequest):
     path = Path(request.path).expanduser()
-    if not path.exists():
+    st = await astat(path)
+    if st is None:
         try:
-            path.mkdir(parents=True, exist_ok=True)
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, lambda: path.mkdir(parents=True, exist_ok=True))
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Cannot create folder: {str(e)}")
-    if not path.is_dir():
+        st = await astat(path)
+    if st is None or not stat.S_ISDIR(st.st_mode):
         raise HTTPException(status_code=400, detail="Path is not a directory")
     return {"valid": True, "path": str(path.absolute())}
 
+def unique_destination(folder: Path, source: Path) -> Path:
+    destination = folder / source.name
+    if not destination.exists():
+        return destination
+    
+    with os.scandir(folder) as it:
+        existing = {entry.name.casefold() for entry in it}
+    candidates = (f"{source.stem}_{i}{source.suffix}" for i in itertools.count(1))
+    return folder / next(name for name in candidates if name.casefold() not in existing)
+
+def transfer_pdf(source: Path, destination: Path, pages_to_keep: int, backup_folder: Path, total_pages: int, same_device: bool) -> str:
+    if pages_to_keep > 0 and backup_folder:
+        backup_folder.mkdir(parents=True, exist_ok=True)
+        backup_dest = unique_destination(backup_folder, source)
+        
+        shutil.copy2(str(source), str(backup_dest))
+        
+        doc = fitz.open(str(source))
+        if total_pages is None:
+            total_pages = len(doc)
+        pages_to_extract = min(pages_to_keep, total_pages)
+        
+        doc.select(list(range(pages_to_extract)))
+        doc.save(str(destination), garbage=4, deflate=True)
+        doc.close()
+        
+        source.unlink()
+        return str(backup_dest)
+    
+    if same_device:
+        os.rename(str(source), str(destination))
+    else:
+        shutil.move(str(source), str(destination))
+    return None
+
 @app.post("/api/move-pdf")
 async def move_pdf(request: MoveRequest):
     source = Path(request.source)
@@ -270,77 +534,46 @@ async def move_pdf(request: MoveRequest):
     pages_to_keep = request.pages_to_keep
     backup_folder = Path(request.backup_folder) if request.backup_folder else None
     
-    if not source.exists():
+    source_st = await astat(source)
+    if source_st is None:
         raise HTTPException(status_code=404, detail="Source file not found")
-    if not dest_folder.exists():
+    dest_st = await astat(dest_folder)
+    if dest_st is None:
         raise HTTPException(status_code=404, detail="Destination folder not found")
     
-    destination = dest_folder / source.name
-    
-    if destination.exists():
-        base = source.stem
-        suffix = source.suffix
-        counter = 1
-        while destination.exists():
-            destination = dest_folder / f"{base}_{counter}{suffix}"
-            counter += 1
-    
-    old_path = str(source)
-    if old_path in preview_cache:
-        del preview_cache[old_path]
-    cache_key = old_path + "_all"
-    if cache_key in preview_cache:
-        del preview_cache[cache_key]
-    
-    backup_path = None
+    loop = asyncio.get_event_loop()
+    destination = await loop.run_in_executor(None, unique_destination, dest_folder, source)
+    total_pages = cached_page_count(source_st)
+    same_device = source_st.st_dev == dest_st.st_dev
     
     try:
-        if pages_to_keep > 0 and backup_folder:
-            backup_folder.mkdir(parents=True, exist_ok=True)
-            backup_dest = backup_folder / source.name
-            if backup_dest.exists():
-                base = source.stem
-                suffix = source.suffix
-                counter = 1
-                while backup_dest.exists():
-                    backup_dest = backup_folder / f"{base}_{counter}{suffix}"
-                    counter += 1
-            
-            shutil.copy2(str(source), str(backup_dest))
-            backup_path = str(backup_dest)
-            
-            doc = fitz.open(str(source))
-            total_pages = len(doc)
-            pages_to_extract = min(pages_to_keep, total_pages)
-            
-            new_doc = fitz.open()
-            new_doc.insert_pdf(doc, from_page=0, to_page=pages_to_extract - 1)
-            new_doc.save(str(destination))
-            new_doc.close()
-            doc.close()
-            
-            source.unlink()
-        else:
-            shutil.move(str(source), str(destination))
+        backup_path = await loop.run_in_executor(
+            None, transfer_pdf, source, destination, pages_to_keep, backup_folder, total_pages, same_device
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to move file: {str(e)}")
     
     return {"success": True, "new_path": str(destination), "backup_path": backup_path}
 
 @app.get("/api/pdf/{pdf_path:path}")
-async def get_pdf(pdf_path: str):
+async def get_pdf(pdf_path: str, request: Request):
     if not pdf_path.startswith("/"):
         pdf_path = "/" + pdf_path
-    path = Path(pdf_path)
-    if not path.exists():
+    st = await astat(pdf_path)
+    if st is None:
         raise HTTPException(status_code=404, detail="PDF not found")
+    
+    headers = {
+        "Cache-Control": "private, max-age=3600",
+        "ETag": make_etag(st, "pdf")
+    }
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
     return FileResponse(
-        path, 
+        pdf_path, 
         media_type="application/pdf",
-        headers={
-            "Cache-Control": "private, max-age=3600",
-            "Accept-Ranges": "bytes"
-        }
+        headers=headers,
+        stat_result=st
     )
 
 app.mount("/static", StaticFiles(directory="static"), name="static")